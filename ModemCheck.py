@@ -44,6 +44,7 @@ from requests.auth import HTTPBasicAuth
 from time import gmtime, mktime, sleep, strftime, strptime
 
 from create_csv import create_csv
+from modem_snapshot import SnapshotWriter, read_snapshot
 
 version = '1.0'
 
@@ -51,6 +52,7 @@ prev_run = 0       # Global - retain data between runs to avoid disk read
 prev_boot = 0      # Global - retain data between runs to avoid disk read
 prev_uptime = 0    # Global - retain data between runs to avoid disk read
 running_data = {}  # Global - retain data between runs to avoid disk read
+snapshot = None    # Global - keep the snapshot file mapped between runs
 logger = logging.getLogger(__name__)
 
 
@@ -65,16 +67,20 @@ def ISO_time(epochtime):
     # return strftime('%Y-%m-%dT%H:%M:%S%z', gmtime(epochtime + local_offset))
 
 
-def fetch_stats(password, user='admin', datafile_name='modem_stats.json'):
+def fetch_stats(password, user='admin', datafile_name='modem_stats.json',
+                snapshot_name=None):
     """ Function to call the modem and compare statistics to its current set.
         We can't just parse the HTML because for some unfathamable reason
         the data we need is in string arrays in the JavaScript functions.
+        If snapshot_name is given the current channel table is also
+        published there for `ModemCheck.py status` and friends.
      """
 
     global prev_run  # holds the previous run version of freqs
     global prev_boot
     global prev_uptime
     global running_data
+    global snapshot
 
     folder = create_csv(modem_model='CM1200v2',downstream_channels=31, upstream_channels=4)
 
@@ -195,6 +201,17 @@ def fetch_stats(password, user='admin', datafile_name='modem_stats.json'):
         logger.error(f'Web page contained bogus data: {page.content}')
         raise ValueError('Web page contained bogus time data.')
 
+    # Publish the raw channel table for other processes before doing
+    # anything slower with it.  It's a secondary output, so a failure here
+    # must not cost us the CSV and JSON data.
+    if snapshot_name:
+        try:
+            if snapshot is None:
+                snapshot = SnapshotWriter(snapshot_name)
+            snapshot.publish(channels, boot_time, uptime, sys_time)
+        except (OSError, ValueError) as e:
+            logger.error(f'Unable to publish snapshot {snapshot_name}: {e}')
+
     # Downstream Power append to csv
     down_power_array = [ISO_time(sys_time)]
     down_snr_array = [ISO_time(sys_time)]
@@ -348,11 +365,40 @@ def fetch_stats(password, user='admin', datafile_name='modem_stats.json'):
                 f'{ISO_time(sys_time)}')
 
 
+def show_status(snapshot_name):
+    """ Print the latest snapshot published by a running ModemCheck.
+        Returns a process exit code.
+    """
+    try:
+        status = read_snapshot(snapshot_name)
+    except (OSError, ValueError, RuntimeError) as e:
+        logger.critical(f'Unable to read snapshot: {e}')
+        return 1
+    if status is None:
+        print(f'No data published to {snapshot_name} yet')
+        return 1
+    print(f'Sample Time: {ISO_time(status["System Time"])}')
+    print(f'Boot Time:   {ISO_time(status["Boot Time"])}')
+    print(f'Uptime:      {timedelta(seconds=status["Uptime"])}')
+    print(f'{"Ch":>3} {"ID":>4} {"Freq MHz":>9} {"Power":>6} {"SNR":>5} '
+          f'{"Correctable":>12} {"UnCorrectable":>14}')
+    for channel_num, chan in status['Channels'].items():
+        print(f'{channel_num:>3} {chan["Channel ID"]:>4} '
+              f'{chan["Frequency [MHz]"]:>9.1f} '
+              f'{chan["Power [dBmV]"]:>6.1f} {chan["SNR [dB]"]:>5.1f} '
+              f'{chan["Correctable Codewords"]:>12} '
+              f'{chan["UnCorrectable Codewords"]:>14}')
+    return 0
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description=('A script to monitor the signal quality of a Netgear'
                      'CMXXXX cable modem'),
         formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('command', nargs='?', default='monitor',
+                        choices=['monitor', 'status'],
+                        help='poll the modem, or print the latest snapshot')
     parser.add_argument('-q', '--quiet', action='store_true',
                         default=None, help='display only critical errors')
     parser.add_argument('-v', '--verbose', action='count', default=None,
@@ -363,6 +409,10 @@ if __name__ == "__main__":
                         help='optional log file (will be appended)')
     parser.add_argument('-d', '--datafile', help='file name of data store',
                         default='ModemData.json')
+    parser.add_argument('-s', '--snapshot',
+                        help='file name of the live channel snapshot '
+                             '(defaults to ModemSnapshot.bin next to the '
+                             'data file)')
     parser.add_argument('-p', '--passfile',
                         help='specify file to read modem password from')
     args = parser.parse_args()
@@ -408,6 +458,16 @@ if __name__ == "__main__":
         fh.setLevel(logging.DEBUG)
     logger.addHandler(fh)
 
+    # The daemon and `status` may run from different working directories,
+    # so keep the snapshot alongside the data file unless told otherwise
+    if args.snapshot is None:
+        args.snapshot = os.path.join(
+            os.path.dirname(os.path.abspath(args.datafile)),
+            'ModemSnapshot.bin')
+
+    if args.command == 'status':
+        sys.exit(show_status(args.snapshot))
+
     # Get the modem password
     if args.passfile:
         with open(args.passfile) as pf:
@@ -422,7 +482,8 @@ if __name__ == "__main__":
     while (1):
         try:
             print(f'{datetime.datetime.now()}: Checking modem data')
-            fetch_stats(password=modem_password, datafile_name=args.datafile)
+            fetch_stats(password=modem_password, datafile_name=args.datafile,
+                        snapshot_name=args.snapshot)
             print('done')
             sleep(15)
         except Exception as e:
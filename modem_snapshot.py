@@ -0,0 +1,172 @@
+#
+# modem_snapshot.py - Publish the latest modem channel table in a fixed layout
+#                     memory-mapped file so other processes can read it
+#                     without parsing ModemData.json.
+#
+# The file is a header followed by MAX_CHANNELS fixed size channel records.
+# Updates use a sequence lock: the writer bumps the sequence number to an odd
+# value, rewrites the body, then bumps it to the next even value.  A reader
+# copies the body and only accepts it if the sequence number was even and
+# unchanged across the copy, otherwise it simply tries again.  Python gives
+# us no memory barriers, so on weakly ordered CPUs (ARM, e.g. a Raspberry Pi)
+# the sequence number alone can't catch a torn copy; the body also carries
+# a CRC32 that the reader checks.
+#
+import mmap
+import os
+import struct
+import zlib
+from time import sleep
+
+SNAPSHOT_MAGIC = b'MODEMSNP'
+SNAPSHOT_VERSION = 2
+MAX_CHANNELS = 64
+
+# magic, version, max channels, sequence, CRC32 of the payload, channel count,
+# boot time, uptime, system time
+_HEADER = struct.Struct('<8sIIQIIqqq')
+# channel number, channel ID, frequency, power, SNR, unerrored, correctable,
+# uncorrectable codewords
+_CHANNEL = struct.Struct('<iidddqqq')
+_SEQ = struct.Struct('<Q')
+_CRC = struct.Struct('<I')
+_SEQ_OFFSET = struct.calcsize('<8sII')
+_BODY_OFFSET = _SEQ_OFFSET + _SEQ.size           # CRC, then the payload
+_PAYLOAD_OFFSET = _BODY_OFFSET + _CRC.size       # everything the CRC covers
+SNAPSHOT_SIZE = _HEADER.size + MAX_CHANNELS * _CHANNEL.size
+
+
+def _check_header(mm):
+    magic, version, max_channels = _HEADER.unpack_from(mm)[:3]
+    return (magic, version, max_channels) == (SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+                                              MAX_CHANNELS)
+
+
+class SnapshotWriter:
+    '''Owns the snapshot file and publishes new channel tables into it'''
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        if (not os.path.isfile(self.path)
+                or os.path.getsize(self.path) != SNAPSHOT_SIZE):
+            # Never shrink or truncate a file a reader may have mapped
+            # (SIGBUS on POSIX, PermissionError on Windows), build a fresh
+            # one alongside and swap it in.
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(bytes(SNAPSHOT_SIZE))
+            os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'r+b')
+        self._mm = mmap.mmap(self._file.fileno(), SNAPSHOT_SIZE)
+        if not _check_header(self._mm):
+            # new or foreign file, start it over with an even sequence number
+            self._mm[:] = bytes(SNAPSHOT_SIZE)
+            _HEADER.pack_into(self._mm, 0, SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+                              MAX_CHANNELS, 0, 0, 0, 0, 0, 0)
+
+    def publish(self, channels, boot_time, uptime, sys_time):
+        '''Write channels (the fetch_stats dict indexed by channel number)
+           and the modem times as one consistent snapshot.  Raises
+           ValueError, leaving the previous snapshot in place, if anything
+           won't fit the file layout.
+        '''
+        # build the whole body first so the odd window is a single copy
+        # and bad data is caught before the published snapshot is touched
+        body = bytearray(SNAPSHOT_SIZE - _BODY_OFFSET)
+        count = min(len(channels), MAX_CHANNELS)
+        try:
+            struct.pack_into('<Iqqq', body, _PAYLOAD_OFFSET - _BODY_OFFSET,
+                             count, boot_time, uptime, sys_time)
+            offset = _HEADER.size - _BODY_OFFSET
+            for channel_num in sorted(channels)[:count]:
+                chan = channels[channel_num]
+                _CHANNEL.pack_into(body, offset, channel_num,
+                                   chan['Channel ID'],
+                                   chan['Frequency [MHz]'],
+                                   chan['Power [dBmV]'], chan['SNR [dB]'],
+                                   chan['Unerrored Codewords'],
+                                   chan['Correctable Codewords'],
+                                   chan['UnCorrectable Codewords'])
+                offset += _CHANNEL.size
+        except (struct.error, KeyError, TypeError) as e:
+            raise ValueError(f'Channel data does not fit the snapshot: {e}')
+        _CRC.pack_into(body, 0,
+                       zlib.crc32(body[_PAYLOAD_OFFSET - _BODY_OFFSET:]))
+
+        seq = _SEQ.unpack_from(self._mm, _SEQ_OFFSET)[0]
+        seq += seq & 1  # recover if a previous writer died mid update
+        _SEQ.pack_into(self._mm, _SEQ_OFFSET, seq + 1)
+        self._mm[_BODY_OFFSET:] = body
+        _SEQ.pack_into(self._mm, _SEQ_OFFSET, seq + 2)
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+
+class SnapshotReader:
+    '''Keeps the snapshot file mapped so repeated reads are cheap'''
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < SNAPSHOT_SIZE:
+                raise ValueError(f'{path} is too short to be a modem '
+                                 'snapshot file.')
+            self._mm = mmap.mmap(f.fileno(), SNAPSHOT_SIZE,
+                                 access=mmap.ACCESS_READ)
+        if not _check_header(self._mm):
+            self._mm.close()
+            raise ValueError(f'{path} is not a version {SNAPSHOT_VERSION} '
+                             'modem snapshot file.')
+
+    def read(self, retries=10000):
+        '''Return the latest snapshot as a dict, or None if nothing has been
+           published yet.
+        '''
+        for _ in range(retries):
+            seq = _SEQ.unpack_from(self._mm, _SEQ_OFFSET)[0]
+            if not seq & 1:
+                data = self._mm[:]
+                if not seq:
+                    return None
+                if (seq == _SEQ.unpack_from(self._mm, _SEQ_OFFSET)[0]
+                        and _CRC.unpack_from(data, _BODY_OFFSET)[0]
+                        == zlib.crc32(data[_PAYLOAD_OFFSET:])):
+                    break
+            # writer is mid update, give it the CPU
+            sleep(0)
+        else:
+            raise RuntimeError('Snapshot writer did not finish an update.')
+
+        (_, _, _, _, _, count, boot_time, uptime,
+         sys_time) = _HEADER.unpack_from(data)
+        channels = {}
+        for i in range(count):
+            (channel_num, channel_id, freq, power, snr, unerrored,
+             correctable, uncorrectable) = _CHANNEL.unpack_from(
+                data, _HEADER.size + i * _CHANNEL.size)
+            channels[channel_num] = {
+                'Channel ID': channel_id,
+                'Frequency [MHz]': freq,
+                'Power [dBmV]': power,
+                'SNR [dB]': snr,
+                'Unerrored Codewords': unerrored,
+                'Correctable Codewords': correctable,
+                'UnCorrectable Codewords': uncorrectable}
+        return {'Sequence': seq,
+                'Boot Time': boot_time,
+                'Uptime': uptime,
+                'System Time': sys_time,
+                'Channels': channels}
+
+    def close(self):
+        self._mm.close()
+
+
+def read_snapshot(path):
+    '''One shot read of the snapshot file at path'''
+    reader = SnapshotReader(path)
+    try:
+        return reader.read()
+    finally:
+        reader.close()
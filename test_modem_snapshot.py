@@ -0,0 +1,267 @@
+import csv
+import json
+import struct
+import zlib
+
+import pytest
+
+import modem_snapshot
+from modem_snapshot import (SNAPSHOT_SIZE, SnapshotReader, SnapshotWriter,
+                            read_snapshot)
+
+CHANNELS = {
+    2: {'Channel ID': 5, 'Frequency [MHz]': 573.0, 'Power [dBmV]': -1.5,
+        'SNR [dB]': 40.1, 'Unerrored Codewords': 123456789012,
+        'Correctable Codewords': 42, 'UnCorrectable Codewords': 7},
+    1: {'Channel ID': 4, 'Frequency [MHz]': 567.0, 'Power [dBmV]': 2.25,
+        'SNR [dB]': 38.6, 'Unerrored Codewords': 10,
+        'Correctable Codewords': 0, 'UnCorrectable Codewords': 0},
+}
+
+
+def test_layout_offsets(tmp_path):
+    # the sequence number and CRC offsets are hard wired into the seqlock
+    # protocol, so check them against what the writer actually produces
+    path = tmp_path / 'snap.bin'
+    writer = SnapshotWriter(path)
+    writer.publish(CHANNELS, 1000, 50, 1050)
+    writer.close()
+    data = path.read_bytes()
+
+    assert len(data) == SNAPSHOT_SIZE
+    assert data[:8] == b'MODEMSNP'
+    assert struct.unpack_from('<Q', data, modem_snapshot._SEQ_OFFSET) == (2,)
+    assert struct.unpack_from('<I', data, modem_snapshot._BODY_OFFSET) == (
+        zlib.crc32(data[modem_snapshot._PAYLOAD_OFFSET:]),)
+    assert struct.unpack_from('<Iqqq', data,
+                              modem_snapshot._PAYLOAD_OFFSET) == (
+        2, 1000, 50, 1050)
+    assert struct.unpack_from('<ii', data, modem_snapshot._HEADER.size) == (
+        1, 4)
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'snap.bin'
+    writer = SnapshotWriter(path)
+    writer.publish(CHANNELS, 1000, 50, 1050)
+    snap = read_snapshot(path)
+    writer.close()
+
+    assert snap['Sequence'] == 2
+    assert (snap['Boot Time'], snap['Uptime'], snap['System Time']) == (
+        1000, 50, 1050)
+    assert list(snap['Channels']) == [1, 2]
+    assert snap['Channels'][2] == CHANNELS[2]
+    assert snap['Channels'][1] == CHANNELS[1]
+
+
+def test_empty_before_first_publish(tmp_path):
+    path = tmp_path / 'snap.bin'
+    SnapshotWriter(path).close()
+    assert read_snapshot(path) is None
+
+
+def test_crashed_writer_recovered(tmp_path):
+    path = tmp_path / 'snap.bin'
+    writer = SnapshotWriter(path)
+    writer.publish(CHANNELS, 1000, 50, 1050)
+    writer.close()
+    # leave the sequence number odd as if the writer died mid update
+    with open(path, 'r+b') as f:
+        f.seek(modem_snapshot._SEQ_OFFSET)
+        f.write(struct.pack('<Q', 3))
+
+    reader = SnapshotReader(path)
+    with pytest.raises(RuntimeError):
+        reader.read(retries=5)
+
+    writer = SnapshotWriter(path)
+    writer.publish({}, 2000, 10, 2010)
+    snap = reader.read()
+    writer.close()
+    reader.close()
+    assert snap['Sequence'] == 6
+    assert snap['Boot Time'] == 2000
+    assert snap['Channels'] == {}
+
+
+def test_torn_body_rejected(tmp_path):
+    path = tmp_path / 'snap.bin'
+    writer = SnapshotWriter(path)
+    writer.publish(CHANNELS, 1000, 50, 1050)
+    writer.close()
+    # corrupt the payload without touching the (even) sequence number
+    with open(path, 'r+b') as f:
+        f.seek(modem_snapshot._HEADER.size)
+        f.write(b'\xff' * 8)
+
+    reader = SnapshotReader(path)
+    with pytest.raises(RuntimeError):
+        reader.read(retries=5)
+    reader.close()
+
+
+def test_wrong_magic(tmp_path):
+    path = tmp_path / 'snap.bin'
+    path.write_bytes(b'NOTASNAP' + bytes(SNAPSHOT_SIZE - 8))
+    with pytest.raises(ValueError):
+        read_snapshot(path)
+
+
+def test_too_short(tmp_path):
+    path = tmp_path / 'snap.bin'
+    path.write_bytes(b'MODEMSNP')
+    with pytest.raises(ValueError):
+        read_snapshot(path)
+
+
+def test_writer_replaces_wrong_size_file(tmp_path):
+    path = tmp_path / 'snap.bin'
+    path.write_bytes(b'junk')
+    writer = SnapshotWriter(path)
+    writer.publish(CHANNELS, 1000, 50, 1050)
+    writer.close()
+    assert path.stat().st_size == SNAPSHOT_SIZE
+    assert read_snapshot(path)['Sequence'] == 2
+
+
+@pytest.mark.parametrize('channels, uptime', [
+    (CHANNELS, 50.5),
+    ({2 ** 40: CHANNELS[1]}, 50),
+    ({1: dict(CHANNELS[1], **{'Correctable Codewords': 2 ** 64})}, 50),
+    ({1: {'Channel ID': 4}}, 50),
+])
+def test_bad_data_keeps_previous_snapshot(tmp_path, channels, uptime):
+    path = tmp_path / 'snap.bin'
+    writer = SnapshotWriter(path)
+    writer.publish(CHANNELS, 1000, 50, 1050)
+    with pytest.raises(ValueError):
+        writer.publish(channels, 2000, uptime, 2050)
+    snap = read_snapshot(path)
+    writer.close()
+
+    assert snap['Sequence'] == 2
+    assert snap['Boot Time'] == 1000
+    assert snap['Channels'][2] == CHANNELS[2]
+
+
+LOGIN_PAGE = b'<html><input name="webToken" value="1234"/></html>'
+STATUS_PAGE = b"""<html>
+<table id="dsTable">
+<tr><td>Channel</td><td>Lock Status</td><td>Modulation</td><td>Channel ID</td>
+<td>Frequency</td><td>Power</td><td>SNR</td><td>Unerrored</td>
+<td>Correctable</td><td>Uncorrectable</td></tr>
+<tr><td>1</td><td>Locked</td><td>QAM256</td><td>4</td><td>567000000 Hz</td>
+<td>2.25 dBmV</td><td>38.6 dB</td><td>10</td><td>0</td><td>0</td></tr>
+<tr><td>2</td><td>Locked</td><td>QAM256</td><td>5</td><td>573000000 Hz</td>
+<td>-1.5 dBmV</td><td>40.1 dB</td><td>123456789012</td><td>42</td><td>7</td></tr>
+<tr><td>3</td><td>Not Locked</td><td>Unknown</td><td>0</td><td>0 Hz</td>
+<td>0.0 dBmV</td><td>0.0 dB</td><td>0</td><td>0</td><td>0</td></tr>
+</table>
+<table id="usTable">
+<tr><td>Channel</td><td>Lock Status</td><td>Modulation</td><td>Channel ID</td>
+<td>Frequency</td><td>Power</td></tr>
+<tr><td>1</td><td>Locked</td><td>ATDMA</td><td>1</td><td>35600000 Hz</td>
+<td>44.0 dBmV</td></tr>
+</table>
+<table><tr>
+<td id="Current_systemtime"><b>Current System Time:</b>Mon Oct 19 12:00:00 2026
+</td>
+<td id="SystemUpTime"><font><b>System Up Time:</b>26:03:04</font></td>
+</tr></table>
+</html>"""
+
+
+class FakeResponse:
+    ok = True
+
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeSession:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def get(self, url):
+        if url.endswith('GenieLogin.asp'):
+            return FakeResponse(LOGIN_PAGE)
+        return FakeResponse(STATUS_PAGE)
+
+    def post(self, url, data):
+        return FakeResponse(b'')
+
+
+@pytest.fixture
+def modem_check(tmp_path, monkeypatch):
+    ModemCheck = pytest.importorskip('ModemCheck')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ModemCheck.requests, 'Session', FakeSession)
+    monkeypatch.setattr(ModemCheck, 'prev_run', 0)
+    monkeypatch.setattr(ModemCheck, 'prev_boot', 0)
+    monkeypatch.setattr(ModemCheck, 'prev_uptime', 0)
+    monkeypatch.setattr(ModemCheck, 'running_data', {})
+    monkeypatch.setattr(ModemCheck, 'snapshot', None)
+    yield ModemCheck
+    if ModemCheck.snapshot is not None:
+        ModemCheck.snapshot.close()
+
+
+def test_fetch_stats_publishes_snapshot(tmp_path, modem_check):
+    snap_path = tmp_path / 'snap.bin'
+    modem_check.fetch_stats('pw', datafile_name=str(tmp_path / 'data.json'),
+                            snapshot_name=str(snap_path))
+    snap = read_snapshot(snap_path)
+
+    assert snap['Sequence'] == 2
+    assert snap['Uptime'] == 26 * 3600 + 3 * 60 + 4
+    assert snap['Boot Time'] == snap['System Time'] - snap['Uptime']
+    assert list(snap['Channels']) == [1, 2]
+    assert snap['Channels'][2] == CHANNELS[2]
+    assert snap['Channels'][1] == CHANNELS[1]
+
+
+def test_fetch_stats_survives_snapshot_failure(tmp_path, modem_check,
+                                               monkeypatch):
+    def broken_writer(path):
+        raise OSError('no space left on device')
+    monkeypatch.setattr(modem_check, 'SnapshotWriter', broken_writer)
+    data_path = tmp_path / 'data.json'
+    modem_check.fetch_stats('pw', datafile_name=str(data_path),
+                            snapshot_name=str(tmp_path / 'snap.bin'))
+
+    with open(tmp_path / 'CM1200v2' / 'down_power.csv', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[-1][1:] == ['2.25', '-1.5']
+    prev_run, running_data, boot_time, uptime = json.loads(
+        data_path.read_text())
+    assert uptime == 26 * 3600 + 3 * 60 + 4
+    assert set(prev_run) == {'567.0', '573.0'}
+
+
+def test_status_output(tmp_path, modem_check, capsys):
+    path = tmp_path / 'snap.bin'
+    writer = SnapshotWriter(path)
+    writer.publish(CHANNELS, 1000, 93784, 94784)
+    writer.close()
+
+    assert modem_check.show_status(str(path)) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == 'Sample Time: 1970-01-02T02:19:44Z'
+    assert lines[1] == 'Boot Time:   1970-01-01T00:16:40Z'
+    assert lines[2] == 'Uptime:      1 day, 2:03:04'
+    assert lines[3].split() == ['Ch', 'ID', 'Freq', 'MHz', 'Power', 'SNR',
+                                'Correctable', 'UnCorrectable']
+    assert lines[4].split() == ['1', '4', '567.0', '2.2', '38.6', '0', '0']
+    assert lines[5].split() == ['2', '5', '573.0', '-1.5', '40.1', '42', '7']
+
+
+def test_status_without_snapshot(tmp_path, modem_check, capsys):
+    path = tmp_path / 'snap.bin'
+    assert modem_check.show_status(str(path)) == 1
+    SnapshotWriter(path).close()
+    assert modem_check.show_status(str(path)) == 1
+    assert 'No data published' in capsys.readouterr().out